@@ -13,6 +13,22 @@ CONTRACTS_IN_CHAINS = {
     "base": "0x895D855a02946E736E493ff44b46a236f77C0C72"
 }
 
+# Chain ID сетей (EIP-155), используются в журнале решений
+CHAIN_IDS = {
+    "ethereum": 1,
+    "bsc": 56,
+    "base": 8453,
+    "arbitrum": 42161
+}
+
+# Адреса wrapped-нативного токена (WETH/WBNB), которым платим за покупку
+WETH_ADDRESSES = {
+    "ethereum": "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2",
+    "bsc": "0xbb4CdB9CBd36B01bD1cBaEBF2De08d9173bc095c",
+    "base": "0x4200000000000000000000000000000000000006",
+    "arbitrum": "0x82aF49447D8a07e3bd95BD0d56f35241523fBab1"
+}
+
 # Методы подписки для разных сетей
 SUBSCRIPTION_METHODS = {
     "ethereum": {
@@ -64,6 +80,16 @@ def get_contract_address(chain_name: str) -> str:
     except KeyError:
         raise Exception(f"Сеть '{chain_name}' не поддерживается.")
     
+def get_chain_id(chain_name: str) -> int:
+    """Получить chain ID сети; 0 для неизвестной сети"""
+    return CHAIN_IDS.get(chain_name, 0)
+
+def get_weth_address(chain_name: str) -> str:
+    try:
+        return WETH_ADDRESSES[chain_name]
+    except KeyError:
+        raise Exception(f"WETH не настроен для сети '{chain_name}'.")
+
 def get_rpc_urls():
     return {
          "arbitrum": 'http://65.108.192.118:8949',
@@ -2,6 +2,7 @@
 Настройка и конфигурация Telegram бота
 """
 import asyncio
+import math
 import logging
 import websockets
 import json
@@ -12,6 +13,8 @@ from dotenv import load_dotenv
 import os
 from blockchain_config import get_ws_url, get_subscription_method, DEFAULT_CONFIG
 from config import Config
+from services.decision_journal import DecisionJournal
+from services.notification_service import NotificationService
 from services.trade_service import TradeService
 from state import State
 
@@ -32,12 +35,15 @@ class TelegramBot:
         
         self.bot = Bot(token=self.bot_token)
         self.dp = Dispatcher()
+        # Список чатов, которым разрешено получать уведомления (через запятую)
+        allowed_chat_ids = [int(chat_id) for chat_id in os.getenv('NOTIFY_CHAT_IDS', '').split(',') if chat_id.strip()]
+        self.notifications = NotificationService(self.bot, allowed_chat_ids=allowed_chat_ids)
         self.state = State()
-        self.trade_service = TradeService(state=self.state, error_callback=self._send_error_message)
+        self.journal = DecisionJournal(os.getenv('DECISION_JOURNAL_PATH', 'data/decisions.bin'))
+        self.trade_service = TradeService(state=self.state, error_callback=self._send_error_message, journal=self.journal)
         self.config = Config()
         self.websocket = None
         self.network = 'arbitrum'
-        self.active_chat_id = None  # Храним ID активного чата
         self._setup_handlers()
     
     def _setup_handlers(self):
@@ -47,19 +53,29 @@ class TelegramBot:
         @self.dp.message(Command("start"))
         async def cmd_start(message: Message):
             """Обработчик команды /start"""
-            # Сохраняем chat_id для отправки ошибок
-            self.active_chat_id = message.chat.id
             welcome_text = (
                 "🤖 Добро пожаловать в KFC Limit Trade Bot!\n\n"
             )
             await message.answer(welcome_text, reply_markup=self._get_main_keyboard())
+            # Подписываем чат на уведомления об ошибках
+            await self._subscribe_chat(message)
+        
+        # Обработчик команды /unsubscribe
+        @self.dp.message(Command("unsubscribe"))
+        async def cmd_unsubscribe(message: Message):
+            """Обработчик команды отписки от уведомлений об ошибках"""
+            self.notifications.unsubscribe(message.chat.id)
+            await message.answer(
+                "🔕 Чат отписан от уведомлений об ошибках. Для повторной подписки отправьте /start.",
+                reply_markup=self._get_main_keyboard()
+            )
         
         # Обработчик кнопки "▶️ Start"
         @self.dp.message(lambda message: message.text == "▶️ Start")
         async def start_monitoring(message: Message):
             """Обработчик кнопки запуска мониторинга блоков"""
-            # Сохраняем chat_id для отправки ошибок
-            self.active_chat_id = message.chat.id
+            # Подписываем чат на уведомления об ошибках
+            await self._subscribe_chat(message)
             
             if await self.state.get_block_monitoring_state():
                 await message.answer("⚠️ Мониторинг блоков уже запущен!")
@@ -89,7 +105,7 @@ class TelegramBot:
         @self.dp.message(lambda message: message.text == "⏹️ Stop")
         async def stop_monitoring(message: Message):
             """Обработчик кнопки остановки мониторинга блоков"""
-            if await self.state.get_block_monitoring_state():
+            if not await self.state.get_block_monitoring_state():
                 await message.answer("⚠️ Мониторинг блоков не запущен!")
                 return
             
@@ -118,6 +134,25 @@ class TelegramBot:
             )
             # Устанавливаем состояние ожидания ввода
             self.state.waiting_for_lp_input = True
+            self.state.waiting_for_policy_input = False
+
+        # Обработчик кнопки "Политика ордера"
+        @self.dp.message(lambda message: message.text == "Политика ордера")
+        async def set_order_policy(message: Message):
+            """Обработчик кнопки настройки политики ордера"""
+            order = await self.state.get_order_policy()
+            await message.answer(
+                f"⚖️ Текущая политика: {order['policy']}, бюджет: {order['max_eth'] or 'по контракту'} ETH, "
+                f"price impact: {order['max_price_impact'] * 100}%, slippage: {order['slippage_bps'] / 100}%\n\n"
+                "Введите новую политику в формате:\n"
+                "<политика> <бюджет_ETH> [price_impact_%] [slippage_%]\n"
+                "Политики: reach_target, max_impact. Бюджет 0 - объем из контракта.\n"
+                "Пример: max_impact 0.5 1 0.5\n\n"
+                "Или нажмите 'Отмена' для возврата в главное меню.",
+                reply_markup=self._get_cancel_keyboard()
+            )
+            self.state.waiting_for_lp_input = False
+            self.state.waiting_for_policy_input = True
 
         # Обработчик кнопки "Текущая пара"
         @self.dp.message(lambda message: message.text == "Текущая пара")
@@ -125,10 +160,12 @@ class TelegramBot:
             """Обработчик кнопки показа текущей пары"""
             lp_state = await self.state.get_lp_state()
             if lp_state['lp'] and lp_state['target_price']:
+                order = await self.state.get_order_policy()
                 await message.answer(
                     f"📊 Адрес контракта ликвидной пары: {lp_state['lp']}\n"
                     f"🎯 Целевая цена: {lp_state['target_price']}\n"
-                    f"Сеть: {lp_state['chain_name']}",
+                    f"Сеть: {lp_state['chain_name']}\n"
+                    f"⚖️ Политика: {order['policy']}, бюджет: {order['max_eth'] or 'по контракту'} ETH",
                     reply_markup=self._get_main_keyboard()
                 )
             else:
@@ -143,6 +180,7 @@ class TelegramBot:
         async def cancel_input(message: Message):
             """Обработчик кнопки отмены"""
             self.state.waiting_for_lp_input = False
+            self.state.waiting_for_policy_input = False
             await message.answer(
                 "❌ Ввод отменен. Возвращаемся в главное меню.",
                 reply_markup=self._get_main_keyboard()
@@ -259,16 +297,56 @@ class TelegramBot:
                         f"❌ Ошибка при обработке данных: {str(e)}",
                         reply_markup=self._get_cancel_keyboard()
                     )
+            elif self.state.waiting_for_policy_input:
+                try:
+                    parts = message.text.strip().split()
+                    if not 2 <= len(parts) <= 4:
+                        await message.answer(
+                            "❌ Неверный формат! Введите: <политика> <бюджет_ETH> [price_impact_%] [slippage_%]\n"
+                            "Пример: max_impact 0.5 1 0.5",
+                            reply_markup=self._get_cancel_keyboard()
+                        )
+                        return
+
+                    order = await self.state.get_order_policy()
+                    policy = parts[0]
+                    max_eth = float(parts[1])
+                    if not math.isfinite(max_eth):
+                        raise ValueError("бюджет должен быть конечным числом")
+                    max_eth = max_eth or None
+                    max_price_impact = float(parts[2]) / 100 if len(parts) > 2 else order['max_price_impact']
+                    slippage_bps = round(float(parts[3]) * 100) if len(parts) > 3 else order['slippage_bps']
+
+                    self.state.set_order_policy(policy, max_eth, max_price_impact, slippage_bps)
+                    self.state.waiting_for_policy_input = False
+                    await message.answer(
+                        f"✅ Политика ордера сохранена: {policy}, бюджет: {max_eth or 'по контракту'} ETH, "
+                        f"price impact: {max_price_impact * 100}%, slippage: {slippage_bps / 100}%",
+                        reply_markup=self._get_main_keyboard()
+                    )
+                except (ValueError, OverflowError) as e:
+                    await message.answer(
+                        f"❌ Неверные параметры политики: {e}",
+                        reply_markup=self._get_cancel_keyboard()
+                    )
             else:
                 return
 
+    async def _subscribe_chat(self, message: Message):
+        """Подписывает чат на уведомления и сообщает, если чат не в списке разрешенных"""
+        if not self.notifications.subscribe(message.chat.id):
+            await message.answer(
+                "⚠️ Этот чат не входит в NOTIFY_CHAT_IDS и не будет получать уведомления об ошибках.",
+                reply_markup=self._get_main_keyboard()
+            )
+
     def _get_main_keyboard(self):
         """Создает основную клавиатуру с кнопками"""
         keyboard = ReplyKeyboardMarkup(
             keyboard=[
                 [KeyboardButton(text="Информация о контрактах.")],
                 [KeyboardButton(text="Добавить ликвид пару")],
-                [KeyboardButton(text="Текущая пара")],
+                [KeyboardButton(text="Текущая пара"), KeyboardButton(text="Политика ордера")],
                 [KeyboardButton(text="▶️ Start"), KeyboardButton(text="⏹️ Stop")]
             ],
             resize_keyboard=True,
@@ -288,15 +366,8 @@ class TelegramBot:
         return keyboard
     
     async def _send_error_message(self, error_message: str):
-        """Отправляет сообщение об ошибке пользователю"""
-        try:
-            if self.active_chat_id:
-                await self.bot.send_message(chat_id=self.active_chat_id, text=error_message)
-                logger.info(f"Ошибка отправлена пользователю в чат {self.active_chat_id}")
-            else:
-                logger.error(f"Ошибка в TradeService (нет активного чата): {error_message}")
-        except Exception as e:
-            logger.error(f"Ошибка при отправке сообщения об ошибке: {e}")
+        """Ставит сообщение об ошибке в очередь уведомлений подписанных чатов"""
+        self.notifications.notify(error_message)
     
     async def start_polling(self):
         """Запуск бота в режиме polling"""
@@ -306,6 +377,9 @@ class TelegramBot:
             # Удаляем webhook если он был установлен
             await self.bot.delete_webhook(drop_pending_updates=True)
             
+            # Запускаем фоновую отправку уведомлений
+            self.notifications.start()
+            
             # Запускаем polling
             await self.dp.start_polling(self.bot)
             
@@ -314,15 +388,23 @@ class TelegramBot:
             raise
         finally:
             # Останавливаем мониторинг при завершении работы бота
-            if await self.state.get_block_monitoring_state():
-                await self._stop_block_monitoring()
-            await self.bot.session.close()
-            logger.info("Бот остановлен")
+            try:
+                if await self.state.get_block_monitoring_state():
+                    await self.trade_service._stop_block_monitoring()
+            finally:
+                await self.notifications.stop()
+                await self.bot.session.close()
+                logger.info("Бот остановлен")
     
     async def stop(self):
         """Остановка бота"""
-        # Останавливаем мониторинг
-        if await self.state.get_block_monitoring_state():
-            await self._stop_block_monitoring()
-        await self.bot.session.close()
-        logger.info("Бот остановлен")
+        try:
+            # Останавливаем мониторинг
+            if await self.state.get_block_monitoring_state():
+                await self.trade_service._stop_block_monitoring()
+        finally:
+            await self.notifications.stop()
+            await self.bot.session.close()
+            # Дописываем журнал решений на диск
+            self.journal.close()
+            logger.info("Бот остановлен")
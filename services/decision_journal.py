@@ -0,0 +1,228 @@
+"""
+Бинарный журнал решений монитора: запись фиксированной ширины и чтение через memory-map
+"""
+import logging
+import os
+import queue
+import struct
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Решения, которые монитор принимает на каждом блоке
+DECISION_SKIP = 0     # цена уже на целевом уровне или выше, покупать нечего
+DECISION_TRIGGER = 1  # цена ниже целевой, контракт вернул ненулевой объем ETH
+DECISION_ERROR = 2    # оценка завершилась ошибкой
+
+JOURNAL_MAGIC = b"KFCJRNL1"
+JOURNAL_VERSION = 2
+
+# Заголовок файла: magic, версия формата, размер записи
+_HEADER = struct.Struct("<8sII")
+HEADER_SIZE = _HEADER.size
+
+# Запись: block_number, timestamp, chain_id, pair, reserve0, reserve1, eth_price_usd,
+# target_price_wei, eth_required, tokens_out, decision.
+# pair - 20 байт адреса пары, чтобы записи разных пар и сетей можно было разделить.
+# uint112/uint256 значения хранятся как два little-endian слова (lo, hi) по 64 бита.
+_RECORD = struct.Struct("<QQQ20s4xQQQQdQQQQQQBxxxxxxx")
+RECORD_SIZE = _RECORD.size
+
+RECORD_DTYPE = np.dtype([
+    ("block_number", "<u8"),
+    ("timestamp", "<u8"),
+    ("chain_id", "<u8"),
+    ("pair", "S20"),
+    ("_pad0", "V4"),
+    ("reserve0", "<u8", (2,)),
+    ("reserve1", "<u8", (2,)),
+    ("eth_price_usd", "<f8"),
+    ("target_price_wei", "<u8", (2,)),
+    ("eth_required", "<u8", (2,)),
+    ("tokens_out", "<u8", (2,)),
+    ("decision", "u1"),
+    ("_pad1", "V7"),
+])
+assert RECORD_DTYPE.itemsize == RECORD_SIZE
+
+_WORD_MASK = (1 << 64) - 1
+_STOP = object()
+
+
+def _split_u128(value: int):
+    """Разбить целое число на два 64-битных слова (lo, hi)"""
+    value = int(value)
+    if value < 0 or value >> 128:
+        raise OverflowError(f"Значение {value} не помещается в 128 бит")
+    return value & _WORD_MASK, value >> 64
+
+
+def pair_key(address: str) -> bytes:
+    """20-байтовый ключ пары из hex-адреса, как он хранится в поле pair.
+
+    Идентификаторы другой длины (например, 32-байтовый pool id Uniswap V4)
+    не поддерживаются: struct молча обрезал бы их до 20 байт.
+    """
+    key = bytes.fromhex(address[2:] if address.startswith("0x") else address)
+    if len(key) != 20:
+        raise ValueError(f"Адрес пары должен быть 20 байт, получено {len(key)}: {address}")
+    return key
+
+
+def words_to_float(words: np.ndarray) -> np.ndarray:
+    """Преобразовать столбец из пар слов (lo, hi) в float64 для анализа"""
+    words = np.asarray(words)
+    return words[..., 1].astype(np.float64) * 2.0 ** 64 + words[..., 0].astype(np.float64)
+
+
+def words_to_int(words) -> int:
+    """Точное значение одной пары слов (lo, hi)"""
+    return int(words[0]) | (int(words[1]) << 64)
+
+
+class DecisionJournal:
+    """Append-only журнал решений. Запись на диск выполняется в фоновом потоке"""
+
+    def __init__(self, path: str, buffer_size: int = 64 * 1024):
+        self.path = path
+        self.buffer_size = buffer_size
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._closed = False
+        self._open_file()
+
+    def _open_file(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._file = open(self.path, "ab", buffering=self.buffer_size)
+        if self._file.tell() == 0:
+            self._file.write(_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, RECORD_SIZE))
+            self._file.flush()
+        else:
+            try:
+                _read_header(self.path)
+            except ValueError:
+                self._file.close()
+                raise
+            # Хвост от прерванной записи обрезаем, чтобы сохранить выравнивание записей
+            size = os.path.getsize(self.path)
+            tail = (size - HEADER_SIZE) % RECORD_SIZE
+            if tail:
+                logger.warning(f"Журнал {self.path}: отброшено {tail} байт неполной записи")
+                self._file.truncate(size - tail)
+
+        self._thread = threading.Thread(target=self._writer_loop, name="decision-journal", daemon=True)
+        self._thread.start()
+
+    def record(self, block_number, timestamp, chain_id, pair_address, reserve0, reserve1, eth_price_usd,
+               target_price_wei, eth_required, tokens_out, decision):
+        """Поставить запись в очередь на запись. Не выполняет дисковых операций"""
+        if self._closed:
+            raise RuntimeError("Журнал решений закрыт")
+        packed = _RECORD.pack(
+            int(block_number),
+            int(timestamp),
+            int(chain_id),
+            pair_key(pair_address),
+            *_split_u128(reserve0),
+            *_split_u128(reserve1),
+            float(eth_price_usd),
+            *_split_u128(target_price_wei),
+            *_split_u128(eth_required),
+            *_split_u128(tokens_out),
+            int(decision),
+        )
+        self._queue.put(packed)
+
+    def _writer_loop(self):
+        """Фоновый поток: пишет записи в буфер и сбрасывает его, когда очередь пуста"""
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    self._file.flush()
+                    return
+                self._file.write(item)
+                if self._queue.empty():
+                    self._file.flush()
+            except Exception as e:
+                logger.error(f"Ошибка записи журнала решений: {e}")
+
+    def close(self):
+        """Дописать оставшиеся записи и закрыть файл"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._file.close()
+
+
+def _read_header(path: str):
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE:
+        raise ValueError(f"Файл {path} не является журналом решений: нет заголовка")
+    magic, version, record_size = _HEADER.unpack(header)
+    if magic != JOURNAL_MAGIC:
+        raise ValueError(f"Файл {path} не является журналом решений")
+    if version != JOURNAL_VERSION or record_size != RECORD_SIZE:
+        raise ValueError(f"Неподдерживаемая версия журнала: {version} (размер записи {record_size})")
+
+
+class DecisionJournalReader:
+    """Чтение журнала решений через memory-map в массивы NumPy без копирования"""
+
+    def __init__(self, path: str):
+        self.path = path
+        _read_header(path)
+        count = (os.path.getsize(path) - HEADER_SIZE) // RECORD_SIZE
+        if count:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,))
+        else:
+            self.records = np.empty(0, dtype=RECORD_DTYPE)
+        # После смены пары или сети номера блоков перестают расти монотонно
+        blocks = self.records["block_number"]
+        self.sorted_by_block = bool(np.all(blocks[1:] >= blocks[:-1]))
+
+    def __len__(self):
+        return len(self.records)
+
+    def slice(self, start=None, stop=None) -> np.ndarray:
+        """Записи по индексам [start, stop)"""
+        return self.records[start:stop]
+
+    def block_range(self, first_block: int, last_block: int, chain_id=None, pair_address=None) -> np.ndarray:
+        """Записи для блоков first_block..last_block включительно.
+
+        Если журнал упорядочен по block_number и фильтр по сети/паре не задан,
+        границы ищутся бинарным поиском и возвращается срез без копирования.
+        Иначе записи отбираются маской (копия).
+        """
+        blocks = self.records["block_number"]
+        if self.sorted_by_block and chain_id is None and pair_address is None:
+            start = np.searchsorted(blocks, first_block, side="left")
+            stop = np.searchsorted(blocks, last_block, side="right")
+            return self.records[start:stop]
+
+        mask = (blocks >= first_block) & (blocks <= last_block)
+        if chain_id is not None:
+            mask &= self.records["chain_id"] == chain_id
+        if pair_address is not None:
+            mask &= self.records["pair"] == pair_key(pair_address)
+        return self.records[mask]
+
+    def column(self, name: str, start=None, stop=None) -> np.ndarray:
+        """Один столбец; 128-битные поля возвращаются как float64"""
+        values = self.records[name][start:stop]
+        if values.ndim == 2:
+            return words_to_float(values)
+        return values
+
+    def close(self):
+        """Освободить отображение файла (после закрытия всех срезов)"""
+        self.records = np.empty(0, dtype=RECORD_DTYPE)
@@ -0,0 +1,170 @@
+"""
+Очередь исходящих уведомлений с фоновой отправкой и ограничением скорости Telegram
+"""
+import asyncio
+import logging
+from collections import OrderedDict, deque
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+
+logger = logging.getLogger(__name__)
+
+# Лимиты Telegram Bot API: не более ~30 сообщений в секунду всего
+# и не более одного сообщения в секунду в один чат
+GLOBAL_RATE_LIMIT = 30
+PER_CHAT_INTERVAL = 1.0
+# Максимум различных ожидающих уведомлений на чат; старые вытесняются
+MAX_PENDING_PER_CHAT = 100
+
+
+class NotificationService:
+    """Рассылка уведомлений подписанным чатам без блокировки вызывающего кода"""
+
+    def __init__(self, bot, allowed_chat_ids=None, global_rate_limit: int = GLOBAL_RATE_LIMIT,
+                 per_chat_interval: float = PER_CHAT_INTERVAL,
+                 max_pending_per_chat: int = MAX_PENDING_PER_CHAT):
+        self.bot = bot
+        # Если список задан, подписаться могут только эти чаты
+        self.allowed_chat_ids = set(allowed_chat_ids) if allowed_chat_ids else None
+        self.global_rate_limit = global_rate_limit
+        self.per_chat_interval = per_chat_interval
+        self.max_pending_per_chat = max_pending_per_chat
+        self.subscribers = set()
+        # Общая очередь входящих уведомлений; рассылку по чатам делает фоновая задача
+        self._inbox = deque()
+        # chat_id -> OrderedDict(текст -> число повторов), порядок - очередность отправки
+        self._pending = {}
+        self._next_send_at = {}
+        self._in_flight = {}
+        self._sent_times = deque()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def subscribe(self, chat_id: int) -> bool:
+        """Подписать чат на уведомления; False, если чата нет в списке разрешенных"""
+        if self.allowed_chat_ids is not None and chat_id not in self.allowed_chat_ids:
+            logger.warning(f"Чат {chat_id} не входит в список разрешенных для уведомлений")
+            return False
+        self.subscribers.add(chat_id)
+        return True
+
+    def unsubscribe(self, chat_id: int):
+        """Отписать чат и удалить его неотправленные уведомления"""
+        self.subscribers.discard(chat_id)
+        self._pending.pop(chat_id, None)
+        self._next_send_at.pop(chat_id, None)
+
+    def notify(self, text: str):
+        """Поставить уведомление в общую очередь. Одна операция в памяти"""
+        self._inbox.append(text)
+        self._wakeup.set()
+
+    def start(self):
+        """Запустить фоновую отправку (требует работающего event loop)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._sender_loop())
+
+    async def stop(self):
+        """Остановить фоновую отправку; неотправленные уведомления отбрасываются"""
+        tasks = list(self._in_flight.values())
+        if self._task is not None:
+            tasks.append(self._task)
+            self._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._in_flight.clear()
+
+    def _fan_out(self):
+        """Разложить уведомления из общей очереди по чатам, объединяя одинаковые"""
+        while self._inbox:
+            text = self._inbox.popleft()
+            if not self.subscribers:
+                logger.error(f"Уведомление без подписчиков: {text}")
+                continue
+            for chat_id in self.subscribers:
+                pending = self._pending.setdefault(chat_id, OrderedDict())
+                if text in pending:
+                    pending[text] += 1
+                    continue
+                if len(pending) >= self.max_pending_per_chat:
+                    dropped, _ = pending.popitem(last=False)
+                    logger.warning(f"Очередь уведомлений чата {chat_id} переполнена, отброшено: {dropped}")
+                pending[text] = 1
+
+    async def _sender_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            self._fan_out()
+            now = loop.time()
+            wait_until = None
+
+            # Каждому готовому чату - своя задача отправки, чтобы медленный ответ
+            # API не задерживал остальные чаты; общий темп ограничивает _acquire_global_slot
+            for chat_id in list(self._pending):
+                pending = self._pending[chat_id]
+                if not pending:
+                    del self._pending[chat_id]
+                    continue
+                if chat_id in self._in_flight:
+                    continue
+                ready_at = self._next_send_at.get(chat_id, 0.0)
+                if ready_at > now:
+                    wait_until = ready_at if wait_until is None else min(wait_until, ready_at)
+                    continue
+                text, count = pending.popitem(last=False)
+                self._in_flight[chat_id] = asyncio.create_task(self._send(chat_id, text, count, loop))
+
+            # Просыпаемся по новому уведомлению, завершению отправки или готовности чата
+            if wait_until is None:
+                await self._wakeup.wait()
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=max(wait_until - loop.time(), 0.0))
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _acquire_global_slot(self, loop):
+        """Скользящее окно в одну секунду для глобального лимита"""
+        while True:
+            now = loop.time()
+            while self._sent_times and now - self._sent_times[0] >= 1.0:
+                self._sent_times.popleft()
+            if len(self._sent_times) < self.global_rate_limit:
+                self._sent_times.append(now)
+                return
+            await asyncio.sleep(1.0 - (now - self._sent_times[0]))
+
+    async def _send(self, chat_id: int, text: str, count: int, loop):
+        message = text if count == 1 else f"{text}\n\n(повторено {count} раз)"
+        try:
+            await self._acquire_global_slot(loop)
+            await self.bot.send_message(chat_id=chat_id, text=message)
+            self._next_send_at[chat_id] = loop.time() + self.per_chat_interval
+            logger.info(f"Уведомление отправлено в чат {chat_id}")
+        except TelegramRetryAfter as e:
+            # Telegram попросил подождать: возвращаем сообщение в начало очереди чата
+            self._next_send_at[chat_id] = loop.time() + e.retry_after
+            if chat_id in self.subscribers:
+                pending = self._pending.setdefault(chat_id, OrderedDict())
+                pending[text] = pending.get(text, 0) + count
+                pending.move_to_end(text, last=False)
+            logger.warning(f"Лимит Telegram для чата {chat_id}, повтор через {e.retry_after} с")
+        except TelegramForbiddenError as e:
+            # Бот заблокирован или удален из чата
+            self.unsubscribe(chat_id)
+            logger.warning(f"Чат {chat_id} отписан от уведомлений: {e}")
+        except TelegramBadRequest as e:
+            if "chat not found" in str(e).lower():
+                self.unsubscribe(chat_id)
+                logger.warning(f"Чат {chat_id} не найден и отписан от уведомлений")
+            else:
+                self._next_send_at[chat_id] = loop.time() + self.per_chat_interval
+                logger.error(f"Ошибка при отправке уведомления в чат {chat_id}: {e}")
+        except Exception as e:
+            self._next_send_at[chat_id] = loop.time() + self.per_chat_interval
+            logger.error(f"Ошибка при отправке уведомления в чат {chat_id}: {e}")
+        finally:
+            self._in_flight.pop(chat_id, None)
+            self._wakeup.set()
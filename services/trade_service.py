@@ -7,19 +7,25 @@ import websockets
 import json
 import traceback
 
-from blockchain_config import get_contract_address, get_rpc_urls, get_subscription_method, get_ws_url
+from blockchain_config import get_chain_id, get_contract_address, get_rpc_urls, get_subscription_method, get_weth_address, get_ws_url
+from services.decision_journal import DECISION_ERROR, DECISION_SKIP, DECISION_TRIGGER
+from services.trade_sizing import size_buy
 from state import State
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class TradeService:
-    def __init__(self, state=None, error_callback=None):
+    def __init__(self, state=None, error_callback=None, journal=None):
         self._last_block_number = None
+        self.websocket = None
         self.state = state if state is not None else State()
         self.pair_abi = json.load(open('./abis/pair_abi.json'))
         self.kfc_swap_abi = json.load(open('./abis/kfc_swap_abi.json'))
+        self.erc20_abi = json.load(open('./abis/erc20_abi.json'))
+        self._token_decimals = {}  # (chain_name, token) -> decimals, читаются один раз
         self.error_callback = error_callback  # Callback для отправки ошибок пользователю
+        self.journal = journal  # DecisionJournal для записи решений по каждому блоку
     
     async def _stop_block_monitoring(self):
         """Остановка мониторинга блоков"""
@@ -113,7 +119,7 @@ class TradeService:
                                 chain_name = pair_state["chain_name"]
                                 target_price = pair_state['target_price']
                                 lp_address = pair_state['lp']
-                                await self.buy_token_v2(chain_name, target_price, lp_address)
+                                await self.buy_token_v2(chain_name, target_price, lp_address, block_number, timestamp)
                                 
                                 # print(f"\n🆕 НОВЫЙ БЛОК ОБНАРУЖЕН!")
                                 # print(f"📊 Номер блока: {block_number}")
@@ -151,7 +157,10 @@ class TradeService:
             self.websocket = None
             logger.info("Мониторинг блоков остановлен")
 
-    async def buy_token_v2(self, chain_name, target_price, lp_address):
+    async def buy_token_v2(self, chain_name, target_price, lp_address, block_number=0, timestamp=0):
+        reserve0 = reserve1 = 0
+        eth_price_usd = Decimal(0)
+        target_price_wei = 0
         try:
             rpc_urls= get_rpc_urls()
             w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(rpc_urls[chain_name]))
@@ -159,22 +168,83 @@ class TradeService:
             contarct_address = get_contract_address(chain_name)
             kfc_contarct = w3.eth.contract(address=w3.to_checksum_address(contarct_address),abi=self.kfc_swap_abi)
             
-            token_0 = w3.to_checksum_address(await pair_contarct.functions.token0().call())
-            token_1 = w3.to_checksum_address(await pair_contarct.functions.token1().call())
+            # Состояние пары читаем на блоке из уведомления, независимые запросы - параллельно
+            block_identifier = block_number or 'latest'
+            token_0, token_1, reserves, eth_price_usd = await asyncio.gather(
+                pair_contarct.functions.token0().call(),
+                pair_contarct.functions.token1().call(),
+                pair_contarct.functions.getReserves().call(block_identifier=block_identifier),
+                self.get_eth_price_usd_binance(),
+            )
+            token_0 = w3.to_checksum_address(token_0)
+            token_1 = w3.to_checksum_address(token_1)
+            reserve0, reserve1, _ = reserves
             target_price_usd = target_price
 
             path = [w3.to_checksum_address(token_0), w3.to_checksum_address(token_1)]
             pair_address = w3.to_checksum_address(contarct_address)
-            eth_price_usd = await self.get_eth_price_usd_binance()
             target_price_eth = Decimal(target_price_usd) / eth_price_usd
             target_price_wei = int(target_price_eth * Decimal(1e18))
-            print(pair_address, token_0, token_1, target_price)
-            result = await kfc_contarct.functions.calculateEthToReachPrice(pair_address, token_0, token_1, target_price_wei).call()
-            print(result)
+            logger.info(f"Блок {block_number}: {pair_address} {token_0} {token_1} target={target_price}")
+            result = await kfc_contarct.functions.calculateEthToReachPrice(pair_address, token_0, token_1, target_price_wei).call(block_identifier=block_identifier)
+            eth_required, tokens_out = result
+            decision = DECISION_TRIGGER if eth_required > 0 else DECISION_SKIP
+            logger.info(f"Блок {block_number}: eth_required={eth_required}, tokens_out={tokens_out}")
+            if decision == DECISION_TRIGGER:
+                # Подбор объема только логируется: его ошибка не должна превращать решение в DECISION_ERROR
+                try:
+                    sizing = await self._size_order(w3, chain_name, token_0, token_1, reserve0, reserve1,
+                                                    target_price_wei, eth_required)
+                    logger.info(f"Блок {block_number}: объем покупки {sizing}")
+                except Exception as e:
+                    logger.error(f"Блок {block_number}: ошибка подбора объема покупки: {e}")
+            self._record_decision(block_number, timestamp, get_chain_id(chain_name), lp_address,
+                                  reserve0, reserve1, eth_price_usd,
+                                  target_price_wei, eth_required, tokens_out, decision)
+            return result
         except Exception as error:
             logger.error(f"Traceback: {traceback.format_exc()}")
+            self._record_decision(block_number, timestamp, get_chain_id(chain_name), lp_address,
+                                  reserve0, reserve1, eth_price_usd,
+                                  target_price_wei, 0, 0, DECISION_ERROR)
             raise error
 
+    async def _size_order(self, w3, chain_name, token_0, token_1, reserve0, reserve1, target_price_wei, eth_required):
+        """Подбирает объем покупки по политике ордера из состояния"""
+        # Порядок token0/token1 в паре задан адресами, поэтому сторону WETH определяем явно
+        weth = w3.to_checksum_address(get_weth_address(chain_name))
+        if token_0 == weth:
+            token_out, reserve_in, reserve_out = token_1, reserve0, reserve1
+        elif token_1 == weth:
+            token_out, reserve_in, reserve_out = token_0, reserve1, reserve0
+        else:
+            logger.warning(f"В паре {token_0}/{token_1} нет WETH, подбор объема пропущен")
+            return None
+
+        key = (chain_name, token_out)
+        if key not in self._token_decimals:
+            token_contract = w3.eth.contract(address=token_out, abi=self.erc20_abi)
+            self._token_decimals[key] = await token_contract.functions.decimals().call()
+
+        order = await self.state.get_order_policy()
+        # Бюджет ордера - только потолок: больше eth_required брать нет смысла, цена уйдет выше целевой
+        max_amount_in = eth_required
+        if order['max_eth']:
+            max_amount_in = min(int(Decimal(str(order['max_eth'])) * Decimal(10**18)), eth_required)
+        return size_buy(reserve_in, reserve_out, target_price_wei, max_amount_in,
+                        out_decimals=self._token_decimals[key],
+                        policy=order['policy'],
+                        max_price_impact=order['max_price_impact'],
+                        slippage_bps=order['slippage_bps'])
+
+    def _record_decision(self, *fields):
+        """Записывает решение в журнал; ошибки журнала не прерывают мониторинг"""
+        if self.journal is None:
+            return
+        try:
+            self.journal.record(*fields)
+        except Exception as e:
+            logger.error(f"Ошибка записи в журнал решений: {e}")
 
     async def get_eth_price_usd_binance(self):
         url = f"https://api.binance.com/api/v3/ticker/price?symbol=ETHUSDT"
@@ -0,0 +1,115 @@
+"""
+Подбор объема покупки по кривой constant-product пары (Uniswap V2)
+"""
+import numpy as np
+
+# Политики выбора объема
+POLICY_REACH_TARGET = "reach_target"  # максимальный объем, не уводящий цену выше целевой
+POLICY_MAX_IMPACT = "max_impact"      # максимальный объем с ограничением price impact
+
+DEFAULT_FEE_BPS = 30        # комиссия пары Uniswap V2: 0.3%
+DEFAULT_SLIPPAGE_BPS = 50   # допуск проскальзывания для expectedTokensOut: 0.5%
+DEFAULT_MAX_PRICE_IMPACT = 0.01
+
+# Сетка долей от максимального объема, строится один раз при импорте.
+# Второй проход уточняет объем внутри шага первого с той же сеткой.
+GRID_POINTS = 256
+_UNIT_GRID = np.linspace(1.0 / GRID_POINTS, 1.0, GRID_POINTS)
+
+
+def get_amount_out(amount_in: int, reserve_in: int, reserve_out: int, fee_bps: int = DEFAULT_FEE_BPS) -> int:
+    """Точный выход пары в целых числах, как в UniswapV2Library.getAmountOut"""
+    amount_in_with_fee = amount_in * (10000 - fee_bps)
+    return amount_in_with_fee * reserve_out // (reserve_in * 10000 + amount_in_with_fee)
+
+
+def evaluate_curve(amounts_in, reserve_in, reserve_out, target_price_wei, out_decimals: int = 18,
+                   fee_bps: int = DEFAULT_FEE_BPS):
+    """Оценивает всю кривую кандидатов за один проход NumPy.
+
+    Цены выражены в wei tokenIn за один целый tokenOut (10**out_decimals
+    минимальных единиц), как target_price_wei.
+    Возвращает словарь массивов: выход, price impact и отклонение цены
+    после сделки от целевой (положительное значение - цена ушла выше цели).
+
+    price impact считается без комиссии пары: это относительное ухудшение
+    цены исполнения из-за кривой x*y=k, amount_in / reserve_in. Комиссия
+    fee_bps учитывается только в выходе и цене после сделки.
+    """
+    amounts_in = np.asarray(amounts_in, dtype=np.float64)
+    reserve_in = float(reserve_in)
+    reserve_out = float(reserve_out)
+
+    amount_in_with_fee = amounts_in * (10000 - fee_bps)
+    amounts_out = amount_in_with_fee * reserve_out / (reserve_in * 10000 + amount_in_with_fee)
+
+    # Цена исполнения без комиссии относительно спота: (x / out_без_комиссии) / (R_in / R_out) - 1
+    price_impact = amounts_in / reserve_in
+    # Цена за минимальную единицу tokenOut, переведенная в цену за целый токен
+    post_price_wei = (reserve_in + amounts_in) / (reserve_out - amounts_out) * 10.0 ** out_decimals
+    target_distance = post_price_wei / float(target_price_wei) - 1.0
+
+    return {
+        "amount_in": amounts_in,
+        "amount_out": amounts_out,
+        "price_impact": price_impact,
+        "post_price_wei": post_price_wei,
+        "target_distance": target_distance,
+    }
+
+
+def size_buy(reserve_in, reserve_out, target_price_wei, max_amount_in,
+             out_decimals: int = 18,
+             policy: str = POLICY_REACH_TARGET,
+             max_price_impact: float = DEFAULT_MAX_PRICE_IMPACT,
+             slippage_bps: int = DEFAULT_SLIPPAGE_BPS,
+             fee_bps: int = DEFAULT_FEE_BPS):
+    """Выбирает объем покупки по политике и считает expectedTokensOut.
+
+    reserve_in - резерв WETH, reserve_out - резерв покупаемого токена с
+    out_decimals знаками. max_amount_in - верхняя граница объема в wei
+    (бюджет ордера). Возвращает None, если ни
+    один кандидат не удовлетворяет политике.
+    """
+    if policy not in (POLICY_REACH_TARGET, POLICY_MAX_IMPACT):
+        raise ValueError(f"Неизвестная политика выбора объема: {policy}")
+    if max_amount_in <= 0 or reserve_in <= 0 or reserve_out <= 0 or target_price_wei <= 0:
+        return None
+
+    def pick(amounts):
+        curve = evaluate_curve(amounts, reserve_in, reserve_out, target_price_wei, out_decimals, fee_bps)
+        allowed = curve["target_distance"] <= 0.0
+        if policy == POLICY_MAX_IMPACT:
+            allowed &= curve["price_impact"] <= max_price_impact
+        # Все метрики монотонно растут с объемом, поэтому разрешенные кандидаты - префикс сетки
+        candidates = np.flatnonzero(allowed)
+        return curve, (candidates[-1] if candidates.size else None)
+
+    amounts = _UNIT_GRID * float(max_amount_in)
+    curve, index = pick(amounts)
+
+    # Уточняем между последним разрешенным и первым запрещенным кандидатом,
+    # чтобы объем, меньший шага сетки, не терялся
+    if index is None or index < GRID_POINTS - 1:
+        low = 0.0 if index is None else amounts[index]
+        high = amounts[0] if index is None else amounts[index + 1]
+        fine_curve, fine_index = pick(low + _UNIT_GRID * (high - low))
+        if fine_index is not None:
+            curve, index = fine_curve, fine_index
+    if index is None:
+        return None
+
+    # Итоговые значения считаются точно в целых числах
+    amount_in = min(int(curve["amount_in"][index]), int(max_amount_in))
+    tokens_out = get_amount_out(amount_in, int(reserve_in), int(reserve_out), fee_bps)
+    if tokens_out == 0:
+        return None
+
+    return {
+        "amount_in": amount_in,
+        "tokens_out": tokens_out,
+        "expected_tokens_out": tokens_out * (10000 - slippage_bps) // 10000,
+        "price_impact": float(curve["price_impact"][index]),
+        "target_distance": float(curve["target_distance"][index]),
+        "policy": policy,
+    }
@@ -1,6 +1,10 @@
+import math
+
 from web3 import Web3, AsyncWeb3
 from blockchain_config import get_rpc_urls
 from config import Config
+from services.trade_sizing import (DEFAULT_MAX_PRICE_IMPACT, DEFAULT_SLIPPAGE_BPS, POLICY_MAX_IMPACT,
+                                   POLICY_REACH_TARGET)
 
 
 class State:
@@ -9,7 +13,13 @@ class State:
         self.lp_target_price = None
         self.chain_name = None
         self.waiting_for_lp_input = False
+        self.waiting_for_policy_input = False
         self.block_monitoring = False
+        # Политика ордера для подбора объема покупки
+        self.sizing_policy = POLICY_REACH_TARGET
+        self.max_eth = None  # бюджет ордера в ETH; None - объем из calculateEthToReachPrice
+        self.max_price_impact = DEFAULT_MAX_PRICE_IMPACT
+        self.slippage_bps = DEFAULT_SLIPPAGE_BPS
     
     async def start_block_monitoring(self):
         self.block_monitoring = True
@@ -60,4 +70,30 @@ class State:
         self.current_lp = lp
         self.lp_target_price = target_price
         self.chain_name = chain_name
-        print(f"Сохранено в состояние: lp={lp}, target_price={target_price}, chain_name={chain_name}")
\ No newline at end of file
+        print(f"Сохранено в состояние: lp={lp}, target_price={target_price}, chain_name={chain_name}")
+
+    async def get_order_policy(self):
+        return {
+            "policy": self.sizing_policy,
+            "max_eth": self.max_eth,
+            "max_price_impact": self.max_price_impact,
+            "slippage_bps": self.slippage_bps
+        }
+
+    def set_order_policy(self, policy: str, max_eth: float = None,
+                         max_price_impact: float = DEFAULT_MAX_PRICE_IMPACT,
+                         slippage_bps: int = DEFAULT_SLIPPAGE_BPS):
+        if policy not in (POLICY_REACH_TARGET, POLICY_MAX_IMPACT):
+            raise ValueError(f"Неизвестная политика: {policy}")
+        if max_eth is not None and (not math.isfinite(max_eth) or max_eth <= 0):
+            raise ValueError("Бюджет ордера должен быть конечным положительным числом")
+        if not math.isfinite(max_price_impact) or not 0 < max_price_impact < 1:
+            raise ValueError("Лимит price impact должен быть в диапазоне (0, 1)")
+        if not isinstance(slippage_bps, int) or not 0 <= slippage_bps < 10000:
+            raise ValueError("Slippage должен быть в диапазоне 0..9999 bps")
+        self.sizing_policy = policy
+        self.max_eth = max_eth
+        self.max_price_impact = max_price_impact
+        self.slippage_bps = slippage_bps
+        print(f"Сохранена политика ордера: policy={policy}, max_eth={max_eth}, "
+              f"max_price_impact={max_price_impact}, slippage_bps={slippage_bps}")
@@ -0,0 +1,124 @@
+import os
+
+import pytest
+
+from services.decision_journal import (DECISION_ERROR, DECISION_SKIP, DECISION_TRIGGER, HEADER_SIZE, RECORD_SIZE,
+                                       DecisionJournal, DecisionJournalReader, pair_key, words_to_float,
+                                       words_to_int)
+
+PAIR_A = "0x" + "ab" * 20
+PAIR_B = "0x" + "cd" * 20
+
+
+def _write(path, rows):
+    journal = DecisionJournal(path)
+    for row in rows:
+        journal.record(*row)
+    journal.close()
+
+
+def _row(block_number, chain_id=42161, pair=PAIR_A, decision=DECISION_SKIP, reserve0=1):
+    return (block_number, 1_700_000_000 + block_number, chain_id, pair, reserve0, 2 * 10**18, 3000.5,
+            10**15, 4 * 10**17, 5 * 10**20, decision)
+
+
+def test_write_and_read_back(tmp_path):
+    path = str(tmp_path / "journal" / "decisions.bin")
+    _write(path, [_row(100, decision=DECISION_TRIGGER), _row(101, decision=DECISION_ERROR)])
+
+    reader = DecisionJournalReader(path)
+    assert len(reader) == 2
+    first = reader.records[0]
+    assert first["block_number"] == 100
+    assert first["timestamp"] == 1_700_000_100
+    assert first["chain_id"] == 42161
+    assert first["pair"] == pair_key(PAIR_A)
+    assert words_to_int(first["reserve1"]) == 2 * 10**18
+    assert first["eth_price_usd"] == 3000.5
+    assert words_to_int(first["target_price_wei"]) == 10**15
+    assert words_to_int(first["eth_required"]) == 4 * 10**17
+    assert words_to_int(first["tokens_out"]) == 5 * 10**20
+    assert list(reader.records["decision"]) == [DECISION_TRIGGER, DECISION_ERROR]
+
+
+def test_reopen_appends(tmp_path):
+    path = str(tmp_path / "decisions.bin")
+    _write(path, [_row(1)])
+    _write(path, [_row(2)])
+
+    assert list(DecisionJournalReader(path).records["block_number"]) == [1, 2]
+
+
+def test_words_above_64_bits(tmp_path):
+    path = str(tmp_path / "decisions.bin")
+    reserve = 2**100 + 12345
+    _write(path, [_row(1, reserve0=reserve)])
+
+    reader = DecisionJournalReader(path)
+    assert words_to_int(reader.records[0]["reserve0"]) == reserve
+    assert reader.column("reserve0")[0] == pytest.approx(float(reserve))
+    assert words_to_float(reader.records["reserve0"])[0] == pytest.approx(float(reserve))
+
+
+def test_value_above_128_bits_rejected(tmp_path):
+    journal = DecisionJournal(str(tmp_path / "decisions.bin"))
+    with pytest.raises(OverflowError):
+        journal.record(*_row(1, reserve0=2**128))
+    journal.close()
+
+
+def test_partial_tail_dropped_on_reopen(tmp_path):
+    path = str(tmp_path / "decisions.bin")
+    _write(path, [_row(1), _row(2)])
+    with open(path, "ab") as f:
+        f.write(b"\x01" * (RECORD_SIZE // 2))
+
+    # Читатель игнорирует неполную запись
+    assert len(DecisionJournalReader(path)) == 2
+
+    # Журнал при открытии обрезает хвост, новые записи остаются выровненными
+    _write(path, [_row(3)])
+    assert os.path.getsize(path) == HEADER_SIZE + 3 * RECORD_SIZE
+    assert list(DecisionJournalReader(path).records["block_number"]) == [1, 2, 3]
+
+
+def test_foreign_file_rejected(tmp_path):
+    path = str(tmp_path / "other.bin")
+    with open(path, "wb") as f:
+        f.write(b"not a journal file")
+
+    with pytest.raises(ValueError):
+        DecisionJournalReader(path)
+    with pytest.raises(ValueError):
+        DecisionJournal(path)
+
+
+def test_block_range_sorted(tmp_path):
+    path = str(tmp_path / "decisions.bin")
+    _write(path, [_row(block) for block in range(100, 110)])
+
+    reader = DecisionJournalReader(path)
+    assert reader.sorted_by_block
+    assert list(reader.block_range(103, 105)["block_number"]) == [103, 104, 105]
+
+
+def test_block_range_unsorted_and_filters(tmp_path):
+    path = str(tmp_path / "decisions.bin")
+    # Смена сети: после блоков Arbitrum идут меньшие номера блоков Ethereum
+    rows = [_row(block) for block in range(250_000_000, 250_000_005)]
+    rows += [_row(block, chain_id=1, pair=PAIR_B) for block in range(20_000_000, 20_000_003)]
+    _write(path, rows)
+
+    reader = DecisionJournalReader(path)
+    assert not reader.sorted_by_block
+    assert list(reader.block_range(20_000_001, 250_000_001)["block_number"]) == [
+        250_000_000, 250_000_001, 20_000_001, 20_000_002]
+    assert list(reader.block_range(0, 2**63, chain_id=1)["block_number"]) == [20_000_000, 20_000_001, 20_000_002]
+    assert len(reader.block_range(0, 2**63, pair_address=PAIR_A)) == 5
+    assert len(reader.block_range(0, 2**63, chain_id=1, pair_address=PAIR_A)) == 0
+
+
+def test_pair_key_rejects_non_address():
+    assert pair_key(PAIR_A) == bytes.fromhex("ab" * 20)
+    with pytest.raises(ValueError):
+        pair_key("0x" + "aa" * 32)
@@ -0,0 +1,147 @@
+import asyncio
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from services.notification_service import NotificationService
+
+
+class FakeBot:
+    """Запоминает отправленные сообщения; errors[chat_id] - исключения для первых отправок"""
+
+    def __init__(self, latency=0.0, errors=None):
+        self.latency = latency
+        self.errors = errors or {}
+        self.sent = []
+
+    async def send_message(self, chat_id, text):
+        await asyncio.sleep(self.latency)
+        errors = self.errors.get(chat_id)
+        if errors:
+            raise errors.pop(0)(chat_id, text)
+        self.sent.append((asyncio.get_running_loop().time(), chat_id, text))
+
+
+def _retry_after(seconds):
+    return lambda chat_id, text: TelegramRetryAfter(
+        method=SendMessage(chat_id=chat_id, text=text), message="Too Many Requests", retry_after=seconds)
+
+
+def _forbidden(chat_id, text):
+    return TelegramForbiddenError(method=SendMessage(chat_id=chat_id, text=text),
+                                  message="Forbidden: bot was blocked by the user")
+
+
+def _bad_request(message):
+    return lambda chat_id, text: TelegramBadRequest(method=SendMessage(chat_id=chat_id, text=text), message=message)
+
+
+async def _run(service, seconds):
+    service.start()
+    await asyncio.sleep(seconds)
+    await service.stop()
+
+
+def test_notify_only_enqueues():
+    service = NotificationService(FakeBot())
+    for chat_id in range(100):
+        service.subscribe(chat_id)
+
+    service.notify("A")
+
+    assert list(service._inbox) == ["A"]
+    assert service._pending == {}
+
+
+def test_identical_alerts_are_coalesced():
+    async def scenario():
+        bot = FakeBot()
+        service = NotificationService(bot, per_chat_interval=0.05)
+        service.subscribe(1)
+        for _ in range(3):
+            service.notify("A")
+        service.notify("B")
+        await _run(service, 0.3)
+        return bot
+
+    bot = asyncio.run(scenario())
+    assert [text for _, _, text in bot.sent] == ["A\n\n(повторено 3 раз)", "B"]
+
+
+def test_per_chat_interval():
+    async def scenario():
+        bot = FakeBot()
+        service = NotificationService(bot, per_chat_interval=0.2)
+        service.subscribe(1)
+        service.subscribe(2)
+        service.notify("A")
+        service.notify("B")
+        await _run(service, 0.6)
+        return bot
+
+    bot = asyncio.run(scenario())
+    assert len(bot.sent) == 4
+    for chat_id in (1, 2):
+        times = [sent_at for sent_at, chat, _ in bot.sent if chat == chat_id]
+        assert times[1] - times[0] >= 0.2
+
+
+def test_global_sliding_window_and_concurrent_sends():
+    async def scenario():
+        # Задержка API больше не ограничивает темп: отправки в разные чаты идут параллельно
+        bot = FakeBot(latency=0.1)
+        service = NotificationService(bot, global_rate_limit=5)
+        for chat_id in range(12):
+            service.subscribe(chat_id)
+        service.notify("A")
+        await _run(service, 2.5)
+        return bot
+
+    bot = asyncio.run(scenario())
+    times = sorted(sent_at for sent_at, _, _ in bot.sent)
+    assert len(times) == 12
+    assert max(sum(1 for other in times if start <= other < start + 1.0) for start in times) <= 5
+    # Первые 5 отправок уложились примерно в одну задержку API
+    assert times[4] - times[0] < 0.05
+
+
+def test_retry_after_requeues_at_front():
+    async def scenario():
+        bot = FakeBot(errors={1: [_retry_after(1)]})
+        service = NotificationService(bot, per_chat_interval=0.05)
+        service.subscribe(1)
+        service.notify("A")
+        service.notify("B")
+        await _run(service, 1.5)
+        return bot, service
+
+    bot, service = asyncio.run(scenario())
+    assert [text for _, _, text in bot.sent] == ["A", "B"]
+    assert 1 in service.subscribers
+
+
+def test_dead_chats_are_unsubscribed():
+    async def scenario():
+        bot = FakeBot(errors={
+            1: [_forbidden],
+            2: [_bad_request("Bad Request: chat not found")],
+            3: [_bad_request("Bad Request: message is too long")],
+        })
+        service = NotificationService(bot, per_chat_interval=0.05)
+        for chat_id in (1, 2, 3, 4):
+            service.subscribe(chat_id)
+        service.notify("A")
+        await _run(service, 0.2)
+        return bot, service
+
+    bot, service = asyncio.run(scenario())
+    assert service.subscribers == {3, 4}
+    assert [chat_id for _, chat_id, _ in bot.sent] == [4]
+
+
+def test_allow_list():
+    service = NotificationService(FakeBot(), allowed_chat_ids=[1])
+
+    assert not service.subscribe(2)
+    assert service.subscribe(1)
+    assert service.subscribers == {1}
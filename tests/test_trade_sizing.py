@@ -0,0 +1,103 @@
+import math
+
+import pytest
+
+from services.trade_sizing import (DEFAULT_FEE_BPS, POLICY_MAX_IMPACT, POLICY_REACH_TARGET, get_amount_out,
+                                   size_buy)
+from state import State
+
+ETH = 10**18
+
+
+def _post_price_wei(reserve_in, reserve_out, amount_in, tokens_out, out_decimals):
+    return (reserve_in + amount_in) * 10**out_decimals / (reserve_out - tokens_out)
+
+
+def test_tokens_out_matches_integer_amount_out():
+    reserve_in, reserve_out = 500 * ETH, 1_000_000 * ETH
+    sizing = size_buy(reserve_in, reserve_out, int(0.00051 * ETH), 10 * ETH)
+
+    assert sizing["policy"] == POLICY_REACH_TARGET
+    assert sizing["tokens_out"] == get_amount_out(sizing["amount_in"], reserve_in, reserve_out)
+    assert sizing["expected_tokens_out"] == sizing["tokens_out"] * 9950 // 10000
+
+
+def test_reach_target_stays_below_target_and_budget():
+    reserve_in, reserve_out = 500 * ETH, 1_000_000 * ETH
+    target = int(0.00051 * ETH)
+    sizing = size_buy(reserve_in, reserve_out, target, 10 * ETH)
+
+    assert 0 < sizing["amount_in"] <= 10 * ETH
+    assert _post_price_wei(reserve_in, reserve_out, sizing["amount_in"], sizing["tokens_out"], 18) <= target
+
+    # Бюджет меньше объема до целевой цены - берем весь бюджет
+    small = size_buy(reserve_in, reserve_out, target, ETH)
+    assert small["amount_in"] == ETH
+
+
+def test_six_decimal_token():
+    reserve_in, reserve_out = 100 * ETH, 200_000 * 10**6
+    target = int(0.00051 * ETH)
+    sizing = size_buy(reserve_in, reserve_out, target, 10 * ETH, out_decimals=6)
+
+    assert sizing is not None
+    assert sizing["tokens_out"] == get_amount_out(sizing["amount_in"], reserve_in, reserve_out)
+    assert _post_price_wei(reserve_in, reserve_out, sizing["amount_in"], sizing["tokens_out"], 6) <= target
+
+
+def test_max_impact_limits_size():
+    reserve_in, reserve_out = 500 * ETH, 1_000_000 * ETH
+    target = int(0.00051 * ETH)
+    full = size_buy(reserve_in, reserve_out, target, 10 * ETH)
+    limited = size_buy(reserve_in, reserve_out, target, 10 * ETH, policy=POLICY_MAX_IMPACT, max_price_impact=0.005)
+
+    assert limited["amount_in"] < full["amount_in"]
+    assert limited["price_impact"] <= 0.005
+
+
+def test_price_above_target_returns_none():
+    assert size_buy(500 * ETH, 1_000_000 * ETH, int(0.0004 * ETH), ETH) is None
+
+
+def test_required_amount_far_below_budget():
+    # Цель на 0.01% выше спота: нужно ~0.025 ETH при бюджете 10 ETH (шаг сетки 0.039 ETH)
+    reserve_in, reserve_out = 500 * ETH, 1_000_000 * ETH
+    target = int(0.0005 * 1.0001 * ETH)
+    sizing = size_buy(reserve_in, reserve_out, target, 10 * ETH)
+
+    assert sizing is not None
+    amount_in = sizing["amount_in"]
+    assert _post_price_wei(reserve_in, reserve_out, amount_in, sizing["tokens_out"], 18) <= target
+    # Объем на 1% больше уже уводит цену выше целевой, то есть найден почти оптимум
+    bigger = int(amount_in * 1.01)
+    assert _post_price_wei(reserve_in, reserve_out, bigger, get_amount_out(bigger, reserve_in, reserve_out), 18) > target
+
+    # Тот же результат при сетке, ограниченной нужным объемом, как делает TradeService
+    capped = size_buy(reserve_in, reserve_out, target, amount_in * 2)
+    assert capped["amount_in"] == pytest.approx(amount_in, rel=0.01)
+
+
+def test_impact_limit_below_fee():
+    # price impact считается без комиссии, поэтому лимит меньше fee_bps достижим
+    reserve_in, reserve_out = 500 * ETH, 1_000_000 * ETH
+    limit = DEFAULT_FEE_BPS / 10000 / 3
+    sizing = size_buy(reserve_in, reserve_out, int(0.00051 * ETH), 10 * ETH,
+                      policy=POLICY_MAX_IMPACT, max_price_impact=limit)
+
+    assert sizing is not None
+    assert sizing["price_impact"] <= limit
+    assert sizing["price_impact"] == pytest.approx(sizing["amount_in"] / reserve_in)
+
+
+@pytest.mark.parametrize("max_eth, max_price_impact, slippage_bps", [
+    (math.nan, 0.01, 50),
+    (math.inf, 0.01, 50),
+    (-1.0, 0.01, 50),
+    (1.0, math.nan, 50),
+    (1.0, 0.01, 10000),
+])
+def test_order_policy_rejects_invalid_values(max_eth, max_price_impact, slippage_bps):
+    state = State()
+    with pytest.raises(ValueError):
+        state.set_order_policy(POLICY_REACH_TARGET, max_eth, max_price_impact, slippage_bps)
+    assert state.max_eth is None